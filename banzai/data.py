@@ -23,6 +23,8 @@ class DataProduct:
     @classmethod
     def from_fits(cls, hdu: fits.HDUList, filename: str, file_path: str):
         buffer = BytesIO()
+        # silentfix repairs malformed cards carried through from the raw telescope
+        # headers, so products stay standard-compliant
         hdu.writeto(buffer, output_verify='silentfix')
         buffer.seek(0)
         return cls(buffer, filename, filepath=file_path)
@@ -157,9 +159,14 @@ class CCDData(Data):
 
     def __itruediv__(self, value):
         if isinstance(value, CCDData):
-            self.uncertainty = np.abs(self.data / value.data) * \
-                               np.sqrt((self.uncertainty / self.data) ** 2 + (value.uncertainty / value.data) ** 2)
+            # Build up the relative uncertainty in place before dividing the data so the
+            # only full-frame temporaries are the two terms we cannot avoid
+            np.divide(self.uncertainty, self.data, out=self.uncertainty)
+            np.square(self.uncertainty, out=self.uncertainty)
+            self.uncertainty += np.square(value.uncertainty / value.data)
+            np.sqrt(self.uncertainty, out=self.uncertainty)
             self.data /= value.data
+            self.uncertainty *= np.abs(self.data)
             self.mask |= value.mask
         else:
             self.__imul__(1.0 / value)
@@ -181,7 +188,11 @@ class CCDData(Data):
     def __isub__(self, value):
         if isinstance(value, CCDData):
             self.data -= value.data
-            self.uncertainty = np.sqrt(value.uncertainty * value.uncertainty + self.uncertainty * self.uncertainty)
+            # Propagate the uncertainty in place; writing through out= keeps the arrays
+            # in their memory maps and avoids allocating full-frame temporaries
+            np.square(self.uncertainty, out=self.uncertainty)
+            self.uncertainty += np.square(value.uncertainty)
+            np.sqrt(self.uncertainty, out=self.uncertainty)
             self.mask |= value.mask
         else:
             self.data -= value
@@ -380,7 +391,9 @@ class CCDData(Data):
             getattr(self, array_name_to_copy)[my_overlap][:] = array_to_copy[:]
 
     def init_poisson_uncertainties(self):
-        self.uncertainty = np.sqrt(self.uncertainty ** 2.0 + np.abs(self.data))
+        np.square(self.uncertainty, out=self.uncertainty)
+        self.uncertainty += np.abs(self.data)
+        np.sqrt(self.uncertainty, out=self.uncertainty)
 
     @property
     def background(self):
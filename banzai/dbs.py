@@ -14,10 +14,12 @@ import numpy as np
 import requests
 from sqlalchemy import create_engine, pool, type_coerce, cast
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, CHAR, JSON, UniqueConstraint, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, CHAR, JSON, UniqueConstraint, Float, \
+    Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.expression import true
 from contextlib import contextmanager
+from functools import lru_cache
 from banzai.logs import get_logger
 
 Base = declarative_base()
@@ -25,6 +27,25 @@ Base = declarative_base()
 logger = get_logger()
 
 
+# Cache one engine and sessionmaker per database so sessions draw connections from a
+# shared pool instead of paying a full connect + auth handshake on every call. The pool
+# handles thread safety; sqlite keeps NullPool since its connections are not shareable
+# across threads.
+_sessionmakers = {}
+
+
+def _get_sessionmaker(db_address):
+    if db_address not in _sessionmakers:
+        if db_address.startswith('sqlite'):
+            engine = create_engine(db_address, poolclass=pool.NullPool)
+        else:
+            engine = create_engine(db_address, pool_pre_ping=True, pool_recycle=1800)
+        # We don't use autoflush typically. I have run into issues where SQLAlchemy would try to flush
+        # incomplete records causing a crash. None of the queries here are large, so it should be ok.
+        _sessionmakers[db_address] = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    return _sessionmakers[db_address]
+
+
 @contextmanager
 def get_session(db_address):
     """
@@ -34,14 +55,7 @@ def get_session(db_address):
     -------
     session: SQLAlchemy Database Session
     """
-    # Build a new engine for each session. This makes things thread safe.
-    engine = create_engine(db_address, poolclass=pool.NullPool)
-    Base.metadata.bind = engine
-
-    # We don't use autoflush typically. I have run into issues where SQLAlchemy would try to flush
-    # incomplete records causing a crash. None of the queries here are large, so it should be ok.
-    db_session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
-    session = db_session()
+    session = _get_sessionmaker(db_address)()
     try:
         yield session
         session.commit()
@@ -74,6 +88,9 @@ class CalibrationImage(Base):
     good_until = Column(DateTime, default=datetime.datetime(3000, 1, 1))
     good_after = Column(DateTime, default=datetime.datetime(1000, 1, 1))
     attributes = Column(JSON)
+    # Calibration lookups always filter on type + instrument + dateobs together, so give
+    # them one composite index to range scan instead of intersecting single-column indexes
+    __table_args__ = (Index('ix_calimages_type_instrument_dateobs', 'type', 'instrument_id', 'dateobs'),)
 
 
 class Instrument(Base):
@@ -115,6 +132,11 @@ class ProcessedImage(Base):
     tries = Column(Integer, default=0)
 
 
+# Parsed configdb payloads keyed by address, stored with the ETag of the response so a
+# re-sync can skip the transfer and the parse when nothing has changed upstream
+_configdb_cache = {}
+
+
 def parse_configdb(configdb_address):
     """
     Parse the contents of the configdb.
@@ -131,7 +153,14 @@ def parse_configdb(configdb_address):
     instruments : list of dicts
               each camera dictionary contains a site, instrument code, and camera type.
     """
-    results = requests.get(configdb_address).json()['results']
+    cached = _configdb_cache.get(configdb_address)
+    if cached is not None and cached['etag'] is not None:
+        response = requests.get(configdb_address, headers={'If-None-Match': cached['etag']})
+        if getattr(response, 'status_code', None) == 304:
+            return cached['sites'], cached['instruments']
+    else:
+        response = requests.get(configdb_address)
+    results = response.json()['results']
     instruments = []
     sites = []
     # this will be removed when configdb is updated
@@ -156,6 +185,8 @@ def parse_configdb(configdb_address):
                             if instrument['name'] in CAMERAS_FOR_INSTRUMENTS:
                                 instrument['camera'] = CAMERAS_FOR_INSTRUMENTS[instrument['name']]
                             instruments.append(instrument)
+    _configdb_cache[configdb_address] = {'etag': getattr(response, 'headers', {}).get('ETag'),
+                                         'sites': sites, 'instruments': instruments}
     return sites, instruments
 
 
@@ -170,7 +201,7 @@ def add_instrument(instrument, db_address):
                              'type': instrument['type']}
 
         instrument_record = add_or_update_record(db_session, Instrument, equivalence_criteria, record_attributes)
-        db_session.commit()
+    _query_for_instrument_cached.cache_clear()
     return instrument_record
 
 
@@ -184,7 +215,6 @@ def add_site(site, db_address):
                              'elevation': site['elevation']}
 
         site_record = add_or_update_record(db_session, Site, equivalence_criteria, record_attributes)
-        db_session.commit()
     return site_record
 
 
@@ -214,8 +244,9 @@ def add_or_update_record(db_session, table_model, equivalence_criteria, record_a
 
     Notes
     -----
-    The added/updated record is added to the database but not committed. You need to call
-    db_session.commit() to write the changes to the database.
+    The added/updated record is added to the session but not committed. The get_session
+    context manager commits when the block exits, so an explicit db_session.commit() is
+    only needed if the changes must be visible before then.
     """
     query = true()
     for key in equivalence_criteria.keys():
@@ -233,27 +264,50 @@ class SiteMissingException(Exception):
     pass
 
 
-def query_for_instrument(db_address, site, camera, name=None):
-    # Short circuit
-    if None in [site, camera]:
-        return None
+class _InstrumentMissingException(Exception):
+    pass
+
+
+@lru_cache(maxsize=256)
+def _query_for_instrument_cached(db_address, site, camera, name):
     with get_session(db_address=db_address) as db_session:
         criteria = (Instrument.site == site) & (Instrument.camera == camera)
         if name is not None:
             criteria &= Instrument.name == name
         instrument = db_session.query(Instrument).filter(criteria).order_by(Instrument.id.desc()).first()
+    if instrument is None:
+        # lru_cache does not cache exceptions, so a miss gets retried next call rather than
+        # being remembered until a worker restart even after configdb syncs the instrument
+        raise _InstrumentMissingException
     return instrument
 
 
+def query_for_instrument(db_address, site, camera, name=None):
+    # This is called once per frame opened but the answer only changes when an instrument
+    # is added, so cache it; add_instrument and populate_instrument_tables clear the cache
+    # Short circuit
+    if None in [site, camera]:
+        return None
+    try:
+        return _query_for_instrument_cached(db_address, site, camera, name)
+    except _InstrumentMissingException:
+        return None
+
+
 def save_calibration_info(calibration_image: CalibrationImage, db_address):
     record_attributes = vars(calibration_image)
     # There is not a clean way to back a dict object from a calibration image object without this instance state
     # parameter. Gross.
     record_attributes.pop('_sa_instance_state')
     with get_session(db_address=db_address) as db_session:
-        add_or_update_record(db_session, CalibrationImage, {'filename': record_attributes['filename']},
-                             record_attributes)
-        db_session.commit()
+        # Only fetch the id for the existence check; hydrating the full record just to
+        # overwrite every column is wasted work
+        existing_id = db_session.query(CalibrationImage.id).filter(
+            CalibrationImage.filename == record_attributes['filename']).scalar()
+        if existing_id is None:
+            db_session.add(CalibrationImage(**record_attributes))
+        else:
+            db_session.query(CalibrationImage).filter(CalibrationImage.id == existing_id).update(record_attributes)
 
 
 def get_processed_image(path, db_address):
@@ -262,22 +316,21 @@ def get_processed_image(path, db_address):
     with get_session(db_address=db_address) as db_session:
         processed_image = add_or_update_record(db_session, ProcessedImage, {'filename': filename},
                                                {'filename': filename})
-        db_session.commit()
     return processed_image
 
 
 def commit_processed_image(processed_image, db_address):
     with get_session(db_address=db_address) as db_session:
         db_session.add(processed_image)
-        db_session.commit()
 
 
 def save_processed_image(path, md5, db_address):
     filename = os.path.basename(path)
-    output_record = get_processed_image(filename, db_address)
-    output_record.success = True
-    output_record.checksum = md5
-    commit_processed_image(output_record, db_address)
+    # Do the lookup and the update in one session so we only pay one connection checkout
+    # and one transaction instead of the two that get + commit used to cost
+    with get_session(db_address=db_address) as db_session:
+        add_or_update_record(db_session, ProcessedImage, {'filename': filename},
+                             {'filename': filename, 'success': True, 'checksum': md5})
 
 
 def get_timezone(site, db_address):
@@ -404,7 +457,6 @@ def mark_frame(filename, mark_as, db_address):
         record_attributes = {'filename': filename,
                              'is_bad': set_is_bad_to}
         add_or_update_record(db_session, CalibrationImage, equivalence_criteria, record_attributes)
-        db_session.commit()
 
 
 def create_db(db_address):
@@ -436,7 +488,31 @@ def populate_instrument_tables(db_address, configdb_address):
     """
     sites, instruments = parse_configdb(configdb_address=configdb_address)
     with get_session(db_address=db_address) as db_session:
+        # Diff against the existing records in Python so we only pay one SELECT per table
+        # and one bulk INSERT for the new rows instead of a round trip per camera
+        existing_sites = {site_record.id: site_record for site_record in db_session.query(Site).all()}
+        new_records = []
         for site in sites:
-            add_site(site, db_address)
-    for instrument in instruments:
-        add_instrument(instrument, db_address)
+            record_attributes = {'id': site['code'],
+                                 'timezone': site['timezone'],
+                                 'longitude': site['longitude'],
+                                 'latitude': site['latitude'],
+                                 'elevation': site['elevation']}
+            site_record = existing_sites.get(site['code'])
+            if site_record is None:
+                new_records.append(Site(**record_attributes))
+            else:
+                for attribute, value in record_attributes.items():
+                    setattr(site_record, attribute, value)
+
+        existing_instruments = {(instrument_record.site, instrument_record.camera, instrument_record.name):
+                                instrument_record for instrument_record in db_session.query(Instrument).all()}
+        for instrument in instruments:
+            instrument_record = existing_instruments.get((instrument['site'], instrument['camera'],
+                                                          instrument['name']))
+            if instrument_record is None:
+                new_records.append(Instrument(**instrument))
+            else:
+                instrument_record.type = instrument['type']
+        db_session.bulk_save_objects(new_records)
+    _query_for_instrument_cached.cache_clear()
@@ -418,8 +418,11 @@ class LCOFrameFactory(FrameFactory):
         else:
             primary_hdu = None
             for hdu in fits_hdu_list:
+                # Header lookups walk the card list every time, so pull the keywords we
+                # test repeatedly into locals once per extension
+                extension_name = hdu.header.get('EXTNAME', '')
                 # Move on from any associated arrays like BPM or ERR
-                if any(associated_extension['FITS_NAME'] in hdu.header.get('EXTNAME', '')
+                if any(associated_extension['FITS_NAME'] in extension_name
                        for associated_extension in self.associated_extensions):
                     continue
                 # Otherwise parse the fits file into a frame object and the corresponding data objects
@@ -431,16 +434,15 @@ class LCOFrameFactory(FrameFactory):
                 # Check if we are looking at a CCD extension
                 elif 'GAIN' in hdu.header:
                     associated_data = {}
-                    condensed_name = hdu.header.get('EXTNAME', '')
+                    condensed_name = extension_name
                     for extension_name_to_condense in runtime_context.EXTENSION_NAMES_TO_CONDENSE:
                         condensed_name = condensed_name.replace(extension_name_to_condense, '')
+                    extension_version = hdu.header.get('EXTVER')
+                    if extension_version == 0:
+                        extension_version = None
                     for associated_extension in self.associated_extensions:
                         associated_extension_name = condensed_name + associated_extension['FITS_NAME']
                         if associated_extension_name in fits_hdu_list:
-                            if hdu.header.get('EXTVER') == 0:
-                                extension_version = None
-                            else:
-                                extension_version = hdu.header.get('EXTVER')
                             associated_data[associated_extension['NAME']] = fits_hdu_list[associated_extension_name,
                                                                                           extension_version].data
                         else:
@@ -451,7 +453,9 @@ class LCOFrameFactory(FrameFactory):
                     if hdu.header.get('INSTRUME') == 'fs01':
                         self._update_fs01_sections(hdu)
                     if hdu.data.dtype == np.uint16:
-                        hdu.data = hdu.data.astype(np.float64)
+                        # float32 keeps 16-bit ADU exactly, matches the dtype we write out,
+                        # and halves the memory traffic of every elementwise stage
+                        hdu.data = hdu.data.astype(np.float32)
                     # check if we need to propagate any header keywords from the primary header
                     if primary_hdu is not None:
                         for keyword in self.primary_header_keys_to_propagate:
@@ -466,10 +470,11 @@ class LCOFrameFactory(FrameFactory):
                     hdu_list.append(ArrayData(data=hdu.data, meta=hdu.header, name=hdu.header.get('EXTNAME')))
 
         # Either use the calibration frame type or normal frame type depending on the OBSTYPE keyword
-        hdu_order = runtime_context.REDUCED_DATA_EXTENSION_ORDERING.get(hdu_list[0].meta.get('OBSTYPE'))
+        obstype = hdu_list[0].meta.get('OBSTYPE')
+        hdu_order = runtime_context.REDUCED_DATA_EXTENSION_ORDERING.get(obstype)
 
-        if hdu_list[0].meta.get('OBSTYPE') in runtime_context.CALIBRATION_IMAGE_TYPES:
-            grouping = runtime_context.CALIBRATION_SET_CRITERIA.get(hdu_list[0].meta.get('OBSTYPE'), [])
+        if obstype in runtime_context.CALIBRATION_IMAGE_TYPES:
+            grouping = runtime_context.CALIBRATION_SET_CRITERIA.get(obstype, [])
             image = self.calibration_frame_class(hdu_list, filename, frame_id=frame_id, grouping_criteria=grouping,
                                                  hdu_order=hdu_order)
         else:
@@ -28,7 +28,7 @@ def _create_logging_tags_dictionary(kwargs):
         image = kwargs.pop('image', None)
         extra_tags = kwargs.pop('extra_tags', None)
         if image:
-            tags.update(_image_to_tags(image))
+            tags.update(image_to_tags(image))
         if extra_tags:
             tags.update(extra_tags)
         tags['processName'] = multiprocessing.current_process().name
@@ -40,7 +40,7 @@ def _create_logging_tags_dictionary(kwargs):
     return kwargs
 
 
-def _image_to_tags(image):
+def image_to_tags(image):
     instrument = getattr(image, 'instrument', None)
     tags = {'filename': os.path.basename(getattr(image, 'filename', '')),
             'site': getattr(instrument, 'site', ''),
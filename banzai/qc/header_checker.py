@@ -4,6 +4,11 @@ format and validates their values.
 @author:ebachelet
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from banzai import logs
 from banzai.stages import Stage
 from banzai.utils import qc
 from banzai.logs import get_logger
@@ -16,18 +21,85 @@ class HeaderChecker(Stage):
     Stage to validate important header keywords.
     """
 
-    RA_MIN = 0.0
-    RA_MAX = 360.0
-    DEC_MIN = -90.0
-    DEC_MAX = 90.0
+    # Stored as NumPy scalars so comparisons against ndarrays skip the float boxing step
+    RA_MIN = np.float64(0.0)
+    RA_MAX = np.float64(360.0)
+    DEC_MIN = np.float64(-90.0)
+    DEC_MAX = np.float64(90.0)
+    # EXPTIME must be strictly positive, so fail anything below the smallest positive float
+    EXPTIME_MIN = np.nextafter(0.0, 1.0)
+
+    RANGE_CHECKED_KEYWORDS = ('CRVAL1', 'CRVAL2', 'EXPTIME')
+    # Preallocated bounds, one row entry per keyword in RANGE_CHECKED_KEYWORDS
+    RANGE_LOWER_BOUNDS = np.array([RA_MIN, DEC_MIN, EXPTIME_MIN], dtype=np.float64)
+    RANGE_UPPER_BOUNDS = np.array([RA_MAX, DEC_MAX, np.inf], dtype=np.float64)
+
+    EXPECTED_HEADER_KEYWORDS = frozenset({'RA', 'DEC', 'CAT-RA', 'CAT-DEC',
+                                          'OFST-RA', 'OFST-DEC', 'TPT-RA',
+                                          'TPT-DEC', 'CRVAL1', 'CRVAL2', 'CRPIX1',
+                                          'CRPIX2', 'EXPTIME'})
+
+    SNAPSHOT_KEYWORDS = EXPECTED_HEADER_KEYWORDS | {'OBSTYPE'}
+
+    # Observation types that legitimately have a zero exposure time
+    NO_EXPOSURE_OBSTYPES = frozenset({'BIAS'})
+
+    FAILURE_KEYS = ('header.keywords.missing.failed', 'header.keywords.na.failed',
+                    'header.ra.failed', 'header.dec.failed', 'header.exptime.failed')
+
+    # Cap the fingerprint cache so reprocessing many nights cannot grow it unbounded
+    MAX_CACHED_FINGERPRINTS = 1024
+
+    MAX_CHECKER_THREADS = 8
 
     def __init__(self, runtime_context):
         super(HeaderChecker, self).__init__(runtime_context)
+        # Maps a fingerprint of the checked keywords to the QC results of a clean pass
+        self._passed_header_fingerprints = {}
+
+    def run(self, images):
+        """
+        Check the frames concurrently over a small thread pool.
+
+        The checks only touch header metadata and the QC write is network bound, so
+        the frames are embarrassingly parallel. Error handling per frame matches
+        Stage.run: a frame whose checks raise is dropped with the exception logged.
+        """
+        if not images:
+            return images
+        with ThreadPoolExecutor(max_workers=min(len(images), self.MAX_CHECKER_THREADS)) as pool:
+            processed_images = list(pool.map(self._run_single, images))
+        return [image for image in processed_images if image is not None]
+
+    def _run_single(self, image):
+        try:
+            logger.info('Running {0}'.format(self.stage_name), image=image)
+            return self.do_stage(image)
+        except Exception:
+            logger.error(logs.format_exception())
+            return None
+
+    def _header_fingerprint(self, header):
+        """
+        Fingerprint the snapshot of checked keywords so identical headers can skip re-validation.
+
+        Returns None if any header value is unhashable, in which case the frame is not cached.
+        """
+        try:
+            return hash(tuple(sorted(header.items())))
+        except TypeError:
+            return None
 
-        self.expected_header_keywords = ['RA', 'DEC', 'CAT-RA', 'CAT-DEC',
-                                         'OFST-RA', 'OFST-DEC', 'TPT-RA',
-                                         'TPT-DEC', 'CRVAL1', 'CRVAL2', 'CRPIX1',
-                                         'CRPIX2', 'EXPTIME']
+    def _header_snapshot(self, image):
+        """
+        Copy the keywords of interest out of the image header in a single pass.
+
+        astropy header lookups are much slower than plain dict access, so we snapshot
+        the handful of keywords the checks need once per frame and run all of the
+        membership and value tests against the resulting dict.
+        """
+        return {keyword: value for keyword, value in image.meta.items()
+                if keyword in self.SNAPSHOT_KEYWORDS}
 
     def do_stage(self, image):
         """
@@ -44,14 +116,97 @@ class HeaderChecker(Stage):
                 the list of validated images object after header check
 
        """
-        logger.info("Checking header sanity.", image=image)
-        bad_keywords = self.check_keywords_missing_or_na(image)
-        self.check_ra_range(image, bad_keywords)
-        self.check_dec_range(image, bad_keywords)
-        self.check_exptime_value(image, bad_keywords)
+        # Build the logging tags once per frame instead of once per log call
+        logging_tags = logs.image_to_tags(image)
+        logger.info("Checking header sanity.", extra_tags=logging_tags)
+        header = self._header_snapshot(image)
+        # If an identical header already passed all of the checks, just replay its QC results
+        fingerprint = self._header_fingerprint(header)
+        cached_results = self._passed_header_fingerprints.get(fingerprint)
+        if cached_results is not None:
+            qc.save_qc_results(self.runtime_context, cached_results, image)
+            return image
+        # Accumulate the QC results from all of the checks into a single backend write
+        qc_results = {}
+        bad_keywords = self.check_keywords_missing_or_na(image, logging_tags=logging_tags, header=header,
+                                                         qc_results=qc_results)
+        self.check_header_ranges(image, bad_keywords, logging_tags=logging_tags, header=header,
+                                 qc_results=qc_results)
+        qc.save_qc_results(self.runtime_context, qc_results, image)
+        if fingerprint is not None and not any(qc_results.get(key) for key in self.FAILURE_KEYS):
+            if len(self._passed_header_fingerprints) >= self.MAX_CACHED_FINGERPRINTS:
+                # Evict the oldest entry; insertion order is good enough here, and the
+                # default guards against two checker threads racing on the same key
+                self._passed_header_fingerprints.pop(next(iter(self._passed_header_fingerprints)), None)
+            self._passed_header_fingerprints[fingerprint] = qc_results
         return image
 
-    def check_keywords_missing_or_na(self, image):
+    def check_header_ranges(self, image, bad_keywords=None, keywords=None, logging_tags=None, header=None,
+                            qc_results=None):
+        """
+        Validate the RA, Dec, and exposure time header values in a single
+        vectorized bounds comparison.
+
+        Parameters
+        ----------
+        image : object
+                a  banzais.image.Image object.
+        bad_keywords: set
+                the set of any keywords that are missing or NA
+        keywords: tuple
+                the subset of RANGE_CHECKED_KEYWORDS to validate; all of them by default
+        logging_tags: dict
+                precomputed logging tags for the image; computed on demand if omitted
+        header: dict
+                snapshot of the keywords of interest; taken on demand if omitted
+        qc_results: dict
+                accumulator for the QC results; if omitted, the results are saved here
+
+        """
+        if bad_keywords is None:
+            bad_keywords = frozenset()
+        save_results = qc_results is None
+        if save_results:
+            qc_results = {}
+        if keywords is None:
+            keywords = self.RANGE_CHECKED_KEYWORDS
+        if logging_tags is None:
+            logging_tags = logs.image_to_tags(image)
+        if header is None:
+            header = self._header_snapshot(image)
+        values = np.full(len(self.RANGE_CHECKED_KEYWORDS), np.nan, dtype=np.float64)
+        for index, keyword in enumerate(self.RANGE_CHECKED_KEYWORDS):
+            if keyword in keywords and keyword not in bad_keywords:
+                values[index] = header[keyword]
+        # NaN entries are keywords we were not asked to check and always compare False
+        out_of_range = (values < self.RANGE_LOWER_BOUNDS) | (values > self.RANGE_UPPER_BOUNDS)
+
+        if 'CRVAL1' in keywords and 'CRVAL1' not in bad_keywords:
+            if out_of_range[0]:
+                logger.error('The header CRVAL1 key got the unexpected value : %s', values[0],
+                             extra_tags=logging_tags)
+            qc_results["header.ra.failed"] = bool(out_of_range[0])
+            qc_results["header.ra.value"] = float(values[0])
+
+        if 'CRVAL2' in keywords and 'CRVAL2' not in bad_keywords:
+            if out_of_range[1]:
+                logger.error('The header CRVAL2 key got the unexpected value : %s', values[1],
+                             extra_tags=logging_tags)
+            qc_results["header.dec.failed"] = bool(out_of_range[1])
+            qc_results["header.dec.value"] = float(values[1])
+
+        if 'EXPTIME' in keywords and 'EXPTIME' not in bad_keywords and 'OBSTYPE' not in bad_keywords:
+            qc_results["header.exptime.value"] = float(values[2])
+            if header['OBSTYPE'] not in self.NO_EXPOSURE_OBSTYPES:
+                if out_of_range[2]:
+                    logger.error('The header EXPTIME key got the unexpected value %s:'
+                                 'null or negative value', values[2], extra_tags=logging_tags)
+                qc_results["header.exptime.failed"] = bool(out_of_range[2])
+
+        if save_results:
+            qc.save_qc_results(self.runtime_context, qc_results, image)
+
+    def check_keywords_missing_or_na(self, image, logging_tags=None, header=None, qc_results=None):
         """
         Logs an error if the keyword is missing or 'N/A' (the default placeholder value).
 
@@ -59,11 +214,17 @@ class HeaderChecker(Stage):
         ----------
         image : object
                 a  banzais.image.Image object.
+        logging_tags: dict
+                precomputed logging tags for the image; computed on demand if omitted
+        header: dict
+                snapshot of the keywords of interest; taken on demand if omitted
+        qc_results: dict
+                accumulator for the QC results; if omitted, the results are saved here
 
         Returns
         -------
-        bad_keywords: list
-                a list of any keywords that are missing or NA
+        bad_keywords: set
+                the set of any keywords that are missing or NA
 
         Notes
         -----
@@ -71,28 +232,35 @@ class HeaderChecker(Stage):
         but the 'N/A' placeholder values should be overwritten by 'NaN'.
 
         """
-        qc_results = {}
-        missing_keywords = []
-        na_keywords = []
-        for keyword in self.expected_header_keywords:
-            if keyword not in image.meta:
-                sentence = 'The header key {0} is not in image header!'.format(keyword)
-                logger.error(sentence, image=image)
-                missing_keywords.append(keyword)
-            elif image.meta[keyword] == 'N/A':
-                sentence = 'The header key {0} got the unexpected value : N/A'.format(keyword)
-                logger.error(sentence, image=image)
-                na_keywords.append(keyword)
+        if logging_tags is None:
+            logging_tags = logs.image_to_tags(image)
+        if header is None:
+            header = self._header_snapshot(image)
+        save_results = qc_results is None
+        if save_results:
+            qc_results = {}
+        missing_keywords = set()
+        na_keywords = set()
+        for keyword in sorted(self.EXPECTED_HEADER_KEYWORDS):
+            if keyword not in header:
+                logger.error('The header key %s is not in image header!', keyword,
+                             extra_tags=logging_tags)
+                missing_keywords.add(keyword)
+            elif header[keyword] == 'N/A':
+                logger.error('The header key %s got the unexpected value : N/A', keyword,
+                             extra_tags=logging_tags)
+                na_keywords.add(keyword)
         are_keywords_missing = len(missing_keywords) > 0
         are_keywords_na = len(na_keywords) > 0
         qc_results["header.keywords.missing.failed"] = are_keywords_missing
         qc_results["header.keywords.na.failed"] = are_keywords_na
         if are_keywords_missing:
-            qc_results["header.keywords.missing.names"] = missing_keywords
+            qc_results["header.keywords.missing.names"] = sorted(missing_keywords)
         if are_keywords_na:
-            qc_results["header.keywords.na.names"] = na_keywords
-        qc.save_qc_results(self.runtime_context, qc_results, image)
-        return missing_keywords + na_keywords
+            qc_results["header.keywords.na.names"] = sorted(na_keywords)
+        if save_results:
+            qc.save_qc_results(self.runtime_context, qc_results, image)
+        return missing_keywords | na_keywords
 
     def check_ra_range(self, image, bad_keywords=None):
         """
@@ -103,21 +271,11 @@ class HeaderChecker(Stage):
         ----------
         image : object
                 a  banzais.image.Image object.
-        bad_keywords: list
-                a list of any keywords that are missing or NA
+        bad_keywords: set
+                the set of any keywords that are missing or NA
 
         """
-        if bad_keywords is None:
-            bad_keywords = []
-        if 'CRVAL1' not in bad_keywords:
-            ra_value = image.meta['CRVAL1']
-            is_bad_ra_value = (ra_value > self.RA_MAX) | (ra_value < self.RA_MIN)
-            if is_bad_ra_value:
-                sentence = 'The header CRVAL1 key got the unexpected value : {0}'.format(ra_value)
-                logger.error(sentence, image=image)
-            qc_results = {"header.ra.failed": is_bad_ra_value,
-                          "header.ra.value": ra_value}
-            qc.save_qc_results(self.runtime_context, qc_results, image)
+        self.check_header_ranges(image, bad_keywords, keywords=('CRVAL1',))
 
     def check_dec_range(self, image, bad_keywords=None):
         """
@@ -128,21 +286,11 @@ class HeaderChecker(Stage):
         ----------
         image : object
                 a  banzais.image.Image object.
-        bad_keywords: list
-                a list of any keywords that are missing or NA
+        bad_keywords: set
+                the set of any keywords that are missing or NA
 
         """
-        if bad_keywords is None:
-            bad_keywords = []
-        if 'CRVAL2' not in bad_keywords:
-            dec_value = image.meta['CRVAL2']
-            is_bad_dec_value = (dec_value > self.DEC_MAX) | (dec_value < self.DEC_MIN)
-            if is_bad_dec_value:
-                sentence = 'The header CRVAL2 key got the unexpected value : {0}'.format(dec_value)
-                logger.error(sentence, image=image)
-            qc_results = {"header.dec.failed": is_bad_dec_value,
-                          "header.dec.value": dec_value}
-            qc.save_qc_results(self.runtime_context, qc_results, image)
+        self.check_header_ranges(image, bad_keywords, keywords=('CRVAL2',))
 
     def check_exptime_value(self, image, bad_keywords=None):
         """
@@ -152,19 +300,7 @@ class HeaderChecker(Stage):
         ----------
         image : object
                 a  banzais.image.Image object.
-        bad_keywords: list
-                a list of any keywords that are missing or NA
+        bad_keywords: set
+                the set of any keywords that are missing or NA
         """
-        if bad_keywords is None:
-            bad_keywords = []
-        if 'EXPTIME' not in bad_keywords and 'OBSTYPE' not in bad_keywords:
-            exptime_value = image.meta['EXPTIME']
-            qc_results = {"header.exptime.value": exptime_value}
-            if image.meta['OBSTYPE'] != 'BIAS':
-                is_exptime_null = exptime_value <= 0.0
-                if is_exptime_null:
-                    sentence = 'The header EXPTIME key got the unexpected value {0}:' \
-                               'null or negative value'.format(exptime_value)
-                    logger.error(sentence, image=image)
-                qc_results["header.exptime.failed"] = is_exptime_null
-            qc.save_qc_results(self.runtime_context, qc_results, image)
+        self.check_header_ranges(image, bad_keywords, keywords=('EXPTIME',))
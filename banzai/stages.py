@@ -1,5 +1,4 @@
 import abc
-import itertools
 from collections.abc import Iterable
 
 from banzai import logs
@@ -35,8 +34,16 @@ class Stage(abc.ABC):
         if not images:
             return images
         if self.group_by_attributes or self.process_by_group:
-            images.sort(key=self.get_grouping)
-            image_sets = [list(image_set) for _, image_set in itertools.groupby(images, self.get_grouping)]
+            # Bucket in a single pass so the grouping criteria are only computed once per
+            # image; sorting first just to use itertools.groupby recomputes them on every
+            # comparison and imposes an ordering the stages do not need
+            grouped_images = {}
+            for image in images:
+                # Criteria like binning are lists, so freeze them to keep the key hashable
+                grouping = tuple(tuple(criterion) if isinstance(criterion, list) else criterion
+                                 for criterion in self.get_grouping(image))
+                grouped_images.setdefault(grouping, []).append(image)
+            image_sets = list(grouped_images.values())
         else:
             # Treat each image individually
             image_sets = images
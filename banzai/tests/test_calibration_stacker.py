@@ -46,6 +46,18 @@ def test_stacking():
     assert np.all(stacked_data.mask == 0)
 
 
+def test_stacking_through_run():
+    # run() groups by the list-valued binning criterion, so make sure it buckets cleanly
+    test_images = [LCOCalibrationFrame([CCDData(np.ones((ny, nx)) * i, meta=fits.Header(header))], '')
+                   for i in range(9)]
+    for image in test_images:
+        image.instrument = instrument
+    stage = FakeStacker(context)
+    stacked_images = stage.run(test_images)
+    assert len(stacked_images) == 1
+    np.testing.assert_allclose(stacked_images[0].data, np.ones((ny, nx)) * np.mean(np.arange(9)))
+
+
 def test_stacking_with_noise():
     test_images = [LCOCalibrationFrame([CCDData(np.random.normal(0.0, 3.0, size=(ny, nx)), meta=fits.Header(header))], '')
                    for i in range(81)]
@@ -1,7 +1,9 @@
 import numpy as np
+from astropy.coordinates import SkyCoord
 from astropy.io.fits import Header
 from astropy.table import Table
 from astropy.io import fits
+from astropy import units
 import pytest
 import io
 
@@ -41,6 +43,36 @@ def test_table_to_fits():
     assert hdu.header.cards['TTYPE3'].comment == 'Column c'
 
 
+def test_parse_ra_dec_decimal_degrees():
+    ra, dec = fits_utils.parse_ra_dec(Header({'CRVAL1': 83.8221, 'CRVAL2': -5.3911}))
+    coord = SkyCoord(83.8221, -5.3911, unit=(units.degree, units.degree))
+    np.testing.assert_allclose(ra, coord.ra.deg)
+    np.testing.assert_allclose(dec, coord.dec.deg)
+
+
+def test_parse_ra_dec_sexagesimal():
+    ra, dec = fits_utils.parse_ra_dec(Header({'RA': '05:35:17.3', 'DEC': '-05:23:28'}))
+    coord = SkyCoord('05:35:17.3', '-05:23:28', unit=(units.hourangle, units.degree))
+    np.testing.assert_allclose(ra, coord.ra.deg)
+    np.testing.assert_allclose(dec, coord.dec.deg)
+
+
+def test_parse_ra_dec_signed_zero():
+    # The sign lives on the lead term, which parses to 0.0, so check we keep it
+    ra, dec = fits_utils.parse_ra_dec(Header({'RA': '-00:30:00', 'DEC': '-00:30:00'}))
+    coord = SkyCoord('-00:30:00', '-00:30:00', unit=(units.hourangle, units.degree))
+    np.testing.assert_allclose(ra, coord.ra.deg)
+    np.testing.assert_allclose(dec, coord.dec.deg)
+
+
+def test_parse_ra_dec_wraps_ra():
+    # RA should wrap into [0, 360) like SkyCoord's Longitude does
+    ra, dec = fits_utils.parse_ra_dec(Header({'CRVAL1': 370.0, 'CRVAL2': 10.0}))
+    coord = SkyCoord(370.0, 10.0, unit=(units.degree, units.degree))
+    np.testing.assert_allclose(ra, coord.ra.deg)
+    np.testing.assert_allclose(dec, coord.dec.deg)
+
+
 def test_sanitize_header():
     header = Header({'CCDSUM': '1 1',
                      'SIMPLE': 'foo',
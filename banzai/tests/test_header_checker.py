@@ -27,29 +27,30 @@ def test_null_input_image():
 def test_all_keywords_missing():
     tester = HeaderChecker(FakeContext())
     bad_keywords = tester.check_keywords_missing_or_na(FakeHeaderImage())
-    assert set(bad_keywords) == set(tester.expected_header_keywords)
+    assert bad_keywords == tester.EXPECTED_HEADER_KEYWORDS
 
 
 def test_all_keywords_na():
     tester = HeaderChecker(FakeContext())
-    image = FakeHeaderImage({keyword: "N/A" for keyword in tester.expected_header_keywords})
+    image = FakeHeaderImage({keyword: "N/A" for keyword in tester.EXPECTED_HEADER_KEYWORDS})
     bad_keywords = tester.check_keywords_missing_or_na(image)
-    assert set(bad_keywords) == set(tester.expected_header_keywords)
+    assert bad_keywords == tester.EXPECTED_HEADER_KEYWORDS
 
 
 def test_all_keywords_okay():
     tester = HeaderChecker(FakeContext())
-    image = FakeHeaderImage({keyword: "test" for keyword in tester.expected_header_keywords})
+    image = FakeHeaderImage({keyword: "test" for keyword in tester.EXPECTED_HEADER_KEYWORDS})
     bad_keywords = tester.check_keywords_missing_or_na(image)
-    assert set(bad_keywords) == set([])
+    assert bad_keywords == set()
 
 
 def test_one_keyword_missing_and_one_na():
     tester = HeaderChecker(FakeContext())
-    image = FakeHeaderImage({keyword: "test" for keyword in tester.expected_header_keywords[1:]})
-    image.meta[tester.expected_header_keywords[1]] = 'N/A'
+    expected_keywords = sorted(tester.EXPECTED_HEADER_KEYWORDS)
+    image = FakeHeaderImage({keyword: "test" for keyword in expected_keywords[1:]})
+    image.meta[expected_keywords[1]] = 'N/A'
     bad_keywords = tester.check_keywords_missing_or_na(image)
-    assert set(bad_keywords) == set(tester.expected_header_keywords[0:2])
+    assert bad_keywords == set(expected_keywords[0:2])
 
 
 def test_ra_outside_range(caplog):
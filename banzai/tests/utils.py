@@ -41,6 +41,9 @@ class FakeCCDData(CCDData):
             self.mask = mask
         if uncertainty is None:
             self.uncertainty = self.read_noise * np.ones(self.data.shape, dtype=self.data.dtype)
+        elif np.isscalar(uncertainty):
+            # The real CCDData always carries an uncertainty array
+            self.uncertainty = np.full(self.data.shape, uncertainty, dtype=self.data.dtype)
         else:
             self.uncertainty = uncertainty
 
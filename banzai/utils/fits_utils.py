@@ -39,35 +39,62 @@ def table_to_fits(table):
     :return: fits BinTableHDU
     """
     hdu = fits.BinTableHDU(table)
-    # Put in the description keywords
-    for k in hdu.header.keys():
-        if 'TTYPE' in k:
-            column_name = hdu.header[k].lower()
-            description = table[column_name].description
-            hdu.header[k] = (column_name.upper(), description)
-            # Get the value of n in TTYPE
-            n = k[5:]
-            hdu.header['TCOMM{0}'.format(n)] = description
+    # Put in the description keywords; go straight to the columns rather than scanning
+    # the whole header for TTYPE cards
+    for n, column in enumerate(table.columns.values(), start=1):
+        hdu.header['TTYPE{0}'.format(n)] = (column.name.upper(), column.description)
+        hdu.header['TCOMM{0}'.format(n)] = column.description
     return hdu
 
 
+def _parse_coordinate(value, hours=False):
+    """
+    Convert a decimal or colon-separated sexagesimal coordinate to degrees
+    :param value: coordinate value from a header
+    :param hours: interpret the value as hours rather than degrees
+    :return: coordinate in degrees
+    """
+    try:
+        degrees = float(value)
+    except (TypeError, ValueError):
+        if value is None:
+            raise TypeError('Coordinate value is missing')
+        lead, minutes, seconds = str(value).split(':')
+        degrees = abs(float(lead)) + float(minutes) / 60.0 + float(seconds) / 3600.0
+        if lead.strip().startswith('-'):
+            degrees = -degrees
+    if hours:
+        degrees *= 15.0
+    return degrees
+
+
+def _coordinates_to_degrees(ra, dec, ra_unit):
+    # Well-formed LCO headers are decimal degrees or colon-separated sexagesimal, which we
+    # can parse with a couple of splits; only unusual formats pay for a full SkyCoord
+    try:
+        # Wrap like SkyCoord's Longitude so e.g. 370 or a negative hour angle lands in [0, 360)
+        ra_degrees = _parse_coordinate(ra, hours=ra_unit is units.hourangle) % 360.0
+        dec_degrees = _parse_coordinate(dec)
+        if abs(dec_degrees) > 90.0:
+            # SkyCoord's Latitude rejects these, which sends parse_ra_dec to its next fallback
+            raise ValueError('Declination {0} is out of range'.format(dec_degrees))
+        return ra_degrees, dec_degrees
+    except (ValueError, TypeError):
+        coord = SkyCoord(ra, dec, unit=(ra_unit, units.degree))
+        return coord.ra.deg, coord.dec.deg
+
+
 def parse_ra_dec(header):
     try:
-        coord = SkyCoord(header.get('CRVAl1'), header.get('CRVAL2'), unit=(units.degree, units.degree))
-        ra = coord.ra.deg
-        dec = coord.dec.deg
+        ra, dec = _coordinates_to_degrees(header.get('CRVAl1'), header.get('CRVAL2'), units.degree)
     except (ValueError, TypeError):
         # Fallback to RA and DEC
         try:
-            coord = SkyCoord(header.get('RA'), header.get('DEC'), unit=(units.hourangle, units.degree))
-            ra = coord.ra.deg
-            dec = coord.dec.deg
+            ra, dec = _coordinates_to_degrees(header.get('RA'), header.get('DEC'), units.hourangle)
         except (ValueError, TypeError):
             # Fallback to Cat-RA and CAT-DEC
             try:
-                coord = SkyCoord(header.get('CAT-RA'), header.get('CAT-DEC'), unit=(units.hourangle, units.degree))
-                ra = coord.ra.deg
-                dec = coord.dec.deg
+                ra, dec = _coordinates_to_degrees(header.get('CAT-RA'), header.get('CAT-DEC'), units.hourangle)
             except (ValueError, TypeError) as e:
                 logger.error('Could not get initial pointing guess. {0}'.format(e),
                              extra_tags={'filename': header.get('ORIGNAME')})
@@ -77,11 +104,14 @@ def parse_ra_dec(header):
 
 def get_primary_header(filename) -> Optional[fits.Header]:
     try:
-        header = fits.getheader(filename, ext=0)
-        for keyword in header:
-            if keyword not in FITS_MANDATORY_KEYWORDS:
-                return header
-        return fits.getheader(filename, ext=1)
+        # Open the file once and reuse the parsed HDU list; falling back to fits.getheader
+        # for extension 1 would re-open and re-parse the file from scratch
+        with fits.open(filename, mode='readonly', memmap=False, lazy_load_hdus=True) as hdu_list:
+            header = hdu_list[0].header
+            for keyword in header:
+                if keyword not in FITS_MANDATORY_KEYWORDS:
+                    return header
+            return hdu_list[1].header
 
     except Exception:
         logger.error("Unable to open fits file: {}".format(logs.format_exception()), extra_tags={'filename': filename})
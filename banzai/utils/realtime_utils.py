@@ -8,17 +8,22 @@ logger = logs.get_logger()
 
 
 def set_file_as_processed(path, db_address):
-    image = dbs.get_processed_image(path, db_address=db_address)
-    if image is not None:
-        image.success = True
-        dbs.commit_processed_image(image, db_address=db_address)
+    # Do the lookup and the update in one session rather than paying for a second
+    # connection checkout and transaction just to commit the changed flag
+    filename = os.path.basename(path)
+    with dbs.get_session(db_address=db_address) as db_session:
+        dbs.add_or_update_record(db_session, dbs.ProcessedImage, {'filename': filename},
+                                 {'filename': filename, 'success': True})
 
 
 def increment_try_number(path, db_address):
-    image = dbs.get_processed_image(path, db_address=db_address)
-    # Otherwise increment the number of tries
-    image.tries += 1
-    dbs.commit_processed_image(image, db_address=db_address)
+    filename = os.path.basename(path)
+    with dbs.get_session(db_address=db_address) as db_session:
+        image = dbs.add_or_update_record(db_session, dbs.ProcessedImage, {'filename': filename},
+                                         {'filename': filename})
+        # A freshly added record has not been flushed yet, so the tries column default
+        # has not been applied and the attribute is still None
+        image.tries = (image.tries or 0) + 1
 
 
 def need_to_process_image(file_info, context):
@@ -1,9 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from banzai.utils import import_utils
 from banzai.context import Context
 from banzai.logs import get_logger
 
 logger = get_logger()
 
+MAX_OPEN_WORKERS = 8
+
 
 def get_stages_for_individual_frame(ordered_stages, last_stage=None, extra_stages=None):
     """
@@ -40,7 +44,13 @@ def get_stages_for_individual_frame(ordered_stages, last_stage=None, extra_stage
 
 def run_pipeline_stages(image_paths: list, runtime_context: Context, calibration_maker: bool = False):
     frame_factory = import_utils.import_attribute(runtime_context.FRAME_FACTORY)()
-    images = [frame_factory.open(image_path, runtime_context) for image_path in image_paths]
+    if len(image_paths) > 1:
+        # Opening a frame is dominated by disk/S3 reads and FITS decompression that
+        # release the GIL, so overlap the opens across a small thread pool
+        with ThreadPoolExecutor(max_workers=min(len(image_paths), MAX_OPEN_WORKERS)) as pool:
+            images = list(pool.map(lambda image_path: frame_factory.open(image_path, runtime_context), image_paths))
+    else:
+        images = [frame_factory.open(image_path, runtime_context) for image_path in image_paths]
     images = [image for image in images if image is not None]
     if len(images) == 0:
         return